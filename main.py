@@ -9,9 +9,13 @@
 import os
 import io
 import re
+import asyncio
 import aiohttp
-from PIL import Image, ImageDraw, ImageFont
-from typing import Optional, Tuple, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageSequence
+from collections import OrderedDict
+from typing import Optional, Tuple, List, Dict, NamedTuple
 
 from astrbot.api import logger
 from astrbot.api.star import Star, Context, register
@@ -29,7 +33,7 @@ PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 FONTS_DIR = os.path.join(PLUGIN_DIR, "fonts")
 
 # 颜色映射
-COLOR_MAP = {
+_COLOR_HEX = {
     "白色": "#FFFFFF",
     "黑色": "#000000",
     "红色": "#FF0000",
@@ -39,6 +43,8 @@ COLOR_MAP = {
     "粉色": "#FF69B4",
     "紫色": "#9400D3",
 }
+# 预先解析为 RGBA 元组，绘制时无需再解析颜色字符串
+COLOR_MAP = {k: ImageColor.getrgb(v) + (255,) for k, v in _COLOR_HEX.items()}
 
 # 位置映射 (x, y 百分比)
 POSITION_MAP = {
@@ -75,10 +81,70 @@ SIZE_MAP = {
 }
 
 # 描边颜色映射
-STROKE_MAP = {
+_STROKE_HEX = {
     "白色描边": "#FFFFFF",
     "黑色描边": "#000000",
 }
+STROKE_MAP = {k: ImageColor.getrgb(v) + (255,) for k, v in _STROKE_HEX.items()}
+
+# 参数关键字 -> (类别, 取值)，解析时每个词只需一次查表
+_TOKEN_KIND = {
+    **{k: ("stroke", k) for k in STROKE_MAP},
+    **{k: ("position", POSITION_ALIAS_MAP[k]) for k in POSITION_ALIAS_MAP},
+    **{k: ("position", k) for k in POSITION_MAP},
+    **{k: ("size", k) for k in SIZE_MAP},
+    **{k: ("color", k) for k in COLOR_MAP},
+}
+
+
+class _TextLayout(NamedTuple):
+    """预渲染的文字图层及其在图片上的位置"""
+    layer: Image.Image
+    pos: Tuple[int, int]
+
+
+@lru_cache(maxsize=1)
+def _discover_font() -> str:
+    """查找可用的中文字体（结果在运行期间不变，只查找一次）"""
+    # 优先使用插件目录下的字体
+    local_fonts = [
+        os.path.join(FONTS_DIR, "Alibaba-PuHuiTi-Bold.ttf"),      # 阿里巴巴普惠体粗体
+        os.path.join(FONTS_DIR, "Alibaba-PuHuiTi-Medium.ttf"),    # 阿里巴巴普惠体中等
+        os.path.join(FONTS_DIR, "SOURCEHANSANSCN-BOLD.OTF"),      # 思源黑体粗体
+        os.path.join(FONTS_DIR, "SOURCEHANSANSCN-MEDIUM.OTF"),    # 思源黑体中等
+        os.path.join(FONTS_DIR, "msyh.ttc"),                       # 微软雅黑
+        os.path.join(FONTS_DIR, "simhei.ttf"),                     # 黑体
+    ]
+    for font in local_fonts:
+        if os.path.exists(font):
+            logger.info(f"[表情文字] 使用本地字体: {font}")
+            return font
+    
+    # 使用系统字体
+    system_fonts = [
+        "C:/Windows/Fonts/msyh.ttc",      # 微软雅黑
+        "C:/Windows/Fonts/simhei.ttf",    # 黑体
+        "C:/Windows/Fonts/simsun.ttc",    # 宋体
+        "/usr/share/fonts/truetype/noto/NotoSansSC-Regular.ttf",  # Linux
+        "/System/Library/Fonts/PingFang.ttc",  # macOS
+    ]
+    for font in system_fonts:
+        if os.path.exists(font):
+            return font
+    
+    logger.warning("[表情文字] 未找到中文字体，将使用默认字体")
+    return ""
+
+
+@lru_cache(maxsize=32)
+def _get_font(path: str, size: int) -> ImageFont.ImageFont:
+    """按 (字体路径, 字号) 缓存字体对象，避免每帧重复从磁盘加载"""
+    try:
+        if path:
+            return ImageFont.truetype(path, size)
+    except Exception:
+        pass
+    return ImageFont.load_default()
 
 
 @register("meme_text", "haoyuedashi", "表情包添加文字插件", "1.0.0")
@@ -91,32 +157,47 @@ class MemeTextPlugin(Star):
         
         # 配置项
         self.command_prefix = self.config.get("command_prefix", "表情加字")
+        self._prefix_len = len(self.command_prefix)
         self.default_color = self.config.get("default_color", "白色")
         self.default_size = self.config.get("default_size", "中字体")
         self.default_position = self._normalize_position(self.config.get("default_position", "下"))
         self.auto_stroke = self.config.get("auto_stroke", True)
         self.stroke_width = self.config.get("stroke_width", 2)
         self.max_text_length = self.config.get("max_text_length", 50)
-        self.cleanup_days = self.config.get("cleanup_days", 2)  # 清理超过N天的文件
+        self.cleanup_days = self.config.get("cleanup_days", 2)  # 启动时清理旧版本遗留的超过N天的临时文件
+        self.max_concurrent = self.config.get("max_concurrent", 4)
+        self.jpeg_quality = self.config.get("jpeg_quality", 92)
+        self.result_cache_size = self.config.get("result_cache_size", 32)
+        self.result_cache_mb = self.config.get("result_cache_mb", 16)
+        self.max_image_edge = self.config.get("max_image_edge", 1280)
+        
+        # 限制同时下载/处理的图片数量
+        self._sem = asyncio.Semaphore(max(1, self.max_concurrent))
+        
+        # 图片处理线程池（Pillow 的 C 实现会释放 GIL，避免阻塞事件循环）
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="meme_text")
         
         # 字体路径
-        self.font_path = self._find_font()
+        self.font_path = _discover_font()
         
-        # 临时文件目录
-        self.temp_dir = os.path.join(PLUGIN_DIR, "temp")
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # 生成结果缓存（LRU）：(图片URL, 文字, 颜色, 大小, 位置, 描边) -> 图片数据
+        # 同时限制条目数和总字节数
+        self._result_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._result_cache_bytes = 0
         
-        # 启动定期清理任务
-        import asyncio
-        asyncio.create_task(self._cleanup_loop())
+        # HTTP 会话（首次下载时创建，插件卸载时关闭）
+        self._http: Optional[aiohttp.ClientSession] = None
         
-        # 立即执行一次清理
+        # 旧版本遗留的临时文件目录（图片现已直接内存发送，不再写入）
+        self.temp_dir = os.path.join(PLUGIN_DIR, "temp")
+        
+        # 启动时清理一次遗留文件
         self._cleanup_old_files()
         
-        logger.info(f"[表情文字] 插件已加载，命令: {self.command_prefix}，自动清理: {self.cleanup_days}天")
+        logger.info(f"[表情文字] 插件已加载，命令: {self.command_prefix}")
 
     def _cleanup_old_files(self):
-        """清理超过指定天数的临时文件"""
+        """清理旧版本遗留的、超过指定天数的临时文件（仅在启动时执行一次）"""
         import time
         try:
             if not os.path.exists(self.temp_dir):
@@ -126,60 +207,23 @@ class MemeTextPlugin(Star):
             max_age = self.cleanup_days * 24 * 60 * 60  # 转换为秒
             cleaned_count = 0
             
-            for filename in os.listdir(self.temp_dir):
-                filepath = os.path.join(self.temp_dir, filename)
-                if os.path.isfile(filepath):
-                    file_age = now - os.path.getmtime(filepath)
+            # scandir 的目录项自带文件类型，判断类型和读取修改时间共用一次 stat
+            with os.scandir(self.temp_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    file_age = now - entry.stat(follow_symlinks=False).st_mtime
                     if file_age > max_age:
                         try:
-                            os.remove(filepath)
+                            os.remove(entry.path)
                             cleaned_count += 1
-                        except Exception as e:
-                            logger.warning(f"[表情文字] 删除文件失败: {filepath}, {e}")
+                        except OSError as e:
+                            logger.warning(f"[表情文字] 删除文件失败: {entry.path}, {e}")
             
             if cleaned_count > 0:
                 logger.info(f"[表情文字] 清理了 {cleaned_count} 个过期临时文件")
         except Exception as e:
             logger.error(f"[表情文字] 清理临时文件失败: {e}")
-
-    async def _cleanup_loop(self):
-        """定期清理循环（每天检查一次）"""
-        import asyncio
-        while True:
-            # 每24小时执行一次清理
-            await asyncio.sleep(24 * 60 * 60)
-            self._cleanup_old_files()
-
-    def _find_font(self) -> str:
-        """查找可用的中文字体"""
-        # 优先使用插件目录下的字体
-        local_fonts = [
-            os.path.join(FONTS_DIR, "Alibaba-PuHuiTi-Bold.ttf"),      # 阿里巴巴普惠体粗体
-            os.path.join(FONTS_DIR, "Alibaba-PuHuiTi-Medium.ttf"),    # 阿里巴巴普惠体中等
-            os.path.join(FONTS_DIR, "SOURCEHANSANSCN-BOLD.OTF"),      # 思源黑体粗体
-            os.path.join(FONTS_DIR, "SOURCEHANSANSCN-MEDIUM.OTF"),    # 思源黑体中等
-            os.path.join(FONTS_DIR, "msyh.ttc"),                       # 微软雅黑
-            os.path.join(FONTS_DIR, "simhei.ttf"),                     # 黑体
-        ]
-        for font in local_fonts:
-            if os.path.exists(font):
-                logger.info(f"[表情文字] 使用本地字体: {font}")
-                return font
-        
-        # 使用系统字体
-        system_fonts = [
-            "C:/Windows/Fonts/msyh.ttc",      # 微软雅黑
-            "C:/Windows/Fonts/simhei.ttf",    # 黑体
-            "C:/Windows/Fonts/simsun.ttc",    # 宋体
-            "/usr/share/fonts/truetype/noto/NotoSansSC-Regular.ttf",  # Linux
-            "/System/Library/Fonts/PingFang.ttc",  # macOS
-        ]
-        for font in system_fonts:
-            if os.path.exists(font):
-                return font
-        
-        logger.warning("[表情文字] 未找到中文字体，将使用默认字体")
-        return ""
 
     def _normalize_position(self, position: str) -> str:
         """标准化位置参数，兼容旧写法与同义写法"""
@@ -197,22 +241,20 @@ class MemeTextPlugin(Star):
             "stroke": None,
         }
         
-        parts = text.strip().split()
+        parts = text.split()
+        
+        # 单个词（不带空格的中文很常见）：不是关键字就整体作为文字，跳过逐词解析
+        if len(parts) == 1 and parts[0] not in _TOKEN_KIND:
+            result["text"] = parts[0]
+            return result
+        
         text_parts = []
         
         for part in parts:
-            # 检查颜色
-            if part in COLOR_MAP:
-                result["color"] = part
-            # 检查大小
-            elif part in SIZE_MAP:
-                result["size"] = part
-            # 检查位置
-            elif part in POSITION_MAP or part in POSITION_ALIAS_MAP:
-                result["position"] = self._normalize_position(part)
-            # 检查描边
-            elif part in STROKE_MAP:
-                result["stroke"] = part
+            kind = _TOKEN_KIND.get(part)
+            # 颜色/大小/位置/描边关键字
+            if kind:
+                result[kind[0]] = kind[1]
             # 其他作为文字
             else:
                 text_parts.append(part)
@@ -220,150 +262,211 @@ class MemeTextPlugin(Star):
         result["text"] = " ".join(text_parts)
         return result
 
-    def _get_stroke_color(self, text_color: str) -> str:
+    def _get_stroke_color(self, text_color: str) -> Tuple[int, int, int, int]:
         """根据文字颜色自动选择描边颜色"""
         # 浅色文字用黑描边，深色文字用白描边
         light_colors = {"白色", "黄色", "粉色"}
         if text_color in light_colors:
-            return "#000000"
-        return "#FFFFFF"
+            return STROKE_MAP["黑色描边"]
+        return STROKE_MAP["白色描边"]
+
+    def _cache_result(self, key: tuple, data: memoryview):
+        """写入结果缓存，超出条目数或字节上限时淘汰最久未使用的条目"""
+        max_bytes = int(self.result_cache_mb * 1024 * 1024)
+        if self.result_cache_size <= 0 or len(data) > max_bytes:
+            return
+        # 复制为 bytes 单独保存，不让缓存拖住整个编码缓冲区
+        data = bytes(data)
+        old = self._result_cache.pop(key, None)
+        if old is not None:
+            self._result_cache_bytes -= len(old)
+        self._result_cache[key] = data
+        self._result_cache_bytes += len(data)
+        while (len(self._result_cache) > self.result_cache_size
+               or self._result_cache_bytes > max_bytes):
+            _, evicted = self._result_cache.popitem(last=False)
+            self._result_cache_bytes -= len(evicted)
+
+    async def _session(self) -> aiohttp.ClientSession:
+        """获取复用的 HTTP 会话（连接池与 DNS 缓存跨请求共享）"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+            self._http = aiohttp.ClientSession(connector=connector)
+        return self._http
 
     async def _download_image(self, url: str) -> Optional[bytes]:
         """下载图片"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                    if resp.status == 200:
-                        return await resp.read()
+            session = await self._session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                if resp.status == 200:
+                    return await resp.read()
         except Exception as e:
             logger.error(f"[表情文字] 下载图片失败: {e}")
         return None
 
-    def _add_text_to_image(self, img: Image.Image, text: str, 
-                           color: str, size: str, position: str,
-                           stroke_color: Optional[str]) -> Image.Image:
-        """给静态图片添加文字"""
-        draw = ImageDraw.Draw(img)
-        
+    def _prepare_text_layout(self, img_size: Tuple[int, int], text: str,
+                             color: str, size: str, position: str,
+                             stroke_color: Optional[str]) -> _TextLayout:
+        """预先计算文字排版并渲染文字图层（与帧无关）"""
+        img_width, img_height = img_size
+
         # 计算字体大小
-        img_width, img_height = img.size
         font_size = int(img_width * SIZE_MAP.get(size, 0.08))
         font_size = max(12, min(font_size, 200))  # 限制范围
-        
-        # 加载字体
-        try:
-            if self.font_path:
-                font = ImageFont.truetype(self.font_path, font_size)
-            else:
-                font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
-        
-        # 计算文字位置
-        bbox = draw.textbbox((0, 0), text, font=font)
+
+        # 加载字体（带缓存）
+        font = _get_font(self.font_path, font_size)
+
+        # 计算文字尺寸（只排版一次）
+        bbox = font.getbbox(text)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
-        
+
         position_key = self._normalize_position(position)
         x_ratio, y_ratio = POSITION_MAP.get(position_key, POSITION_MAP["下中"])
         x = int(img_width * x_ratio - text_width // 2)
         y = int(img_height * y_ratio - text_height // 2)
-        
+
         # 确保文字在图片范围内（含边距保护）
         padding = max(8, int(min(img_width, img_height) * 0.04))
         max_x = max(padding, img_width - text_width - padding)
         max_y = max(padding, img_height - text_height - padding)
         x = max(padding, min(x, max_x))
         y = max(padding, min(y, max_y))
-        
+
         # 获取颜色
-        fill_color = COLOR_MAP.get(color, "#FFFFFF")
-        
-        # 绘制文字（带描边）
+        fill_color = COLOR_MAP.get(color, COLOR_MAP["白色"])
+
+        # 描边设置
         if stroke_color:
-            stroke_hex = STROKE_MAP.get(stroke_color, stroke_color)
-            draw.text((x, y), text, font=font, fill=fill_color, 
-                     stroke_width=self.stroke_width, stroke_fill=stroke_hex)
+            stroke_fill = STROKE_MAP.get(stroke_color) or ImageColor.getcolor(stroke_color, "RGBA")
+            stroke_w = self.stroke_width
         elif self.auto_stroke:
-            auto_stroke = self._get_stroke_color(color)
-            draw.text((x, y), text, font=font, fill=fill_color,
-                     stroke_width=self.stroke_width, stroke_fill=auto_stroke)
+            stroke_fill = self._get_stroke_color(color)
+            stroke_w = self.stroke_width
         else:
-            draw.text((x, y), text, font=font, fill=fill_color)
-        
+            stroke_fill = None
+            stroke_w = 0
+
+        # 预先把文字连同描边渲染到透明图层，每帧只需一次合成，不必逐帧排版和描边
+        layer_bbox = font.getbbox(text, stroke_width=stroke_w)
+        text_layer = Image.new("RGBA", (layer_bbox[2] - layer_bbox[0], layer_bbox[3] - layer_bbox[1]), (0, 0, 0, 0))
+        layer_draw = ImageDraw.Draw(text_layer, "RGBA")
+        if stroke_w:
+            layer_draw.text((-layer_bbox[0], -layer_bbox[1]), text, font=font, fill=fill_color,
+                            stroke_width=stroke_w, stroke_fill=stroke_fill)
+        else:
+            layer_draw.text((-layer_bbox[0], -layer_bbox[1]), text, font=font, fill=fill_color)
+        layer_pos = (max(0, x + layer_bbox[0]), max(0, y + layer_bbox[1]))
+
+        return _TextLayout(text_layer, layer_pos)
+
+    def _draw_prepared(self, img: Image.Image, layout: _TextLayout) -> Image.Image:
+        """将预渲染的文字图层合成到 RGBA 图片上"""
+        img.alpha_composite(layout.layer, layout.pos)
         return img
 
-    def _add_text_to_gif(self, img_data: bytes, text: str,
+    def _add_text_to_image(self, img: Image.Image, text: str, 
+                           color: str, size: str, position: str,
+                           stroke_color: Optional[str]) -> Image.Image:
+        """给静态图片添加文字"""
+        layout = self._prepare_text_layout(img.size, text, color, size, position, stroke_color)
+        return self._draw_prepared(img, layout)
+
+    def _fit_size(self, img_size: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """超过最大边长时返回等比缩小后的尺寸，否则返回 None"""
+        img_width, img_height = img_size
+        longest = max(img_width, img_height)
+        if self.max_image_edge <= 0 or longest <= self.max_image_edge:
+            return None
+        scale = self.max_image_edge / longest
+        return max(1, round(img_width * scale)), max(1, round(img_height * scale))
+
+    def _to_rgba(self, img: Image.Image, target_size: Optional[Tuple[int, int]]) -> Image.Image:
+        """转换为 RGBA 并按需缩小，总是返回新图片
+
+        能直接缩放的模式先在原模式下缩小再转换，避免分配全尺寸的 RGBA 缓冲区；
+        P/1 模式只能最近邻缩放，需要先转换。
+        """
+        if target_size and img.mode not in ("P", "PA", "1"):
+            img = img.resize(target_size, Image.LANCZOS)
+            return img if img.mode == "RGBA" else img.convert("RGBA")
+        img = img.convert("RGBA")
+        if target_size:
+            img = img.resize(target_size, Image.LANCZOS)
+        return img
+
+    def _add_text_to_gif(self, img: Image.Image, text: str,
                          color: str, size: str, position: str,
-                         stroke_color: Optional[str]) -> bytes:
-        """给 GIF 添加文字（逐帧处理）"""
-        img = Image.open(io.BytesIO(img_data))
-        
-        frames = []
-        durations = []
-        
-        try:
-            while True:
-                # 转换为 RGBA
-                frame = img.convert("RGBA")
-                # 添加文字
-                frame = self._add_text_to_image(frame, text, color, size, position, stroke_color)
-                frames.append(frame)
-                
-                # 获取帧延迟
-                duration = img.info.get("duration", 100)
-                durations.append(duration)
-                
-                img.seek(img.tell() + 1)
-        except EOFError:
-            pass
-        
-        if not frames:
-            return img_data
+                         stroke_color: Optional[str]) -> memoryview:
+        """给 GIF 添加文字（逐帧处理），img 为已打开的 GIF"""
+        # 超大 GIF 逐帧缩小后再绘制
+        target_size = self._fit_size(img.size)
+        
+        # 排版与帧无关，只计算一次
+        layout = self._prepare_text_layout(target_size or img.size, text, color, size, position, stroke_color)
+        
+        def draw_frame(frame: Image.Image) -> Image.Image:
+            # 帧缓冲区会被后续帧复用，必须在副本上绘制
+            result = self._draw_prepared(self._to_rgba(frame, target_size), layout)
+            # 帧延迟随帧保存，编码时逐帧读取
+            result.info["duration"] = frame.info.get("duration", 100)
+            return result
+        
+        # 首帧先绘制，其余帧边解码边编码，不在内存中堆积
+        frames = ImageSequence.Iterator(img)
+        first = draw_frame(next(frames))
+        append_images = (draw_frame(frame) for frame in frames)
         
         # 保存为 GIF
         output = io.BytesIO()
-        frames[0].save(
+        first.save(
             output,
             format="GIF",
             save_all=True,
-            append_images=frames[1:],
-            duration=durations,
+            append_images=append_images,
             loop=0,
             disposal=2
         )
-        output.seek(0)
-        return output.read()
+        # 直接返回缓冲区视图，避免再复制一份编码结果
+        return output.getbuffer()
 
     def _process_image(self, img_data: bytes, text: str,
                        color: str, size: str, position: str,
-                       stroke_color: Optional[str]) -> Tuple[bytes, str]:
-        """处理图片，返回 (图片数据, 格式)"""
+                       stroke_color: Optional[str]) -> Tuple[memoryview, str]:
+        """处理图片，返回 (图片数据, 格式)，图片数据为编码缓冲区的视图"""
         img = Image.open(io.BytesIO(img_data))
         img_format = img.format.lower() if img.format else "png"
         
         # GIF 特殊处理
         if img_format == "gif":
-            result_data = self._add_text_to_gif(img_data, text, color, size, position, stroke_color)
+            result_data = self._add_text_to_gif(img, text, color, size, position, stroke_color)
             return result_data, "gif"
         
-        # 静态图片处理
-        if img.mode == "RGBA":
-            result_img = self._add_text_to_image(img, text, color, size, position, stroke_color)
-        else:
-            result_img = self._add_text_to_image(img.convert("RGBA"), text, color, size, position, stroke_color)
+        # 大尺寸 JPEG 解码时直接按 2 的幂缩小，减少解码量
+        if img_format in ("jpeg", "jpg") and self.max_image_edge > 0:
+            img.draft("RGB", (self.max_image_edge, self.max_image_edge))
         
-        # 保存（优先保持原格式，最大质量）
+        # 静态图片处理：超大图片先缩小，文字只需绘制在显示尺寸上
+        target_size = self._fit_size(img.size)
+        if img.mode != "RGBA" or target_size:
+            img = self._to_rgba(img, target_size)
+        
+        result_img = self._add_text_to_image(img, text, color, size, position, stroke_color)
+        
+        # 保存（优先保持原格式）
         output = io.BytesIO()
         if img_format == "jpeg" or img_format == "jpg":
             result_img = result_img.convert("RGB")
-            # 使用最高质量和无二次采样保持清晰度
-            result_img.save(output, format="JPEG", quality=100, subsampling=0)
-            return output.getvalue(), "jpg"
+            # 无二次采样保持文字边缘清晰，质量 92 左右肉眼无差别但体积小得多
+            result_img.save(output, format="JPEG", quality=self.jpeg_quality, subsampling=0,
+                            optimize=True, progressive=True)
+            return output.getbuffer(), "jpg"
         else:
             # PNG 无损压缩，不会模糊
             result_img.save(output, format="PNG", optimize=False)
-            return output.getvalue(), "png"
+            return output.getbuffer(), "png"
 
     async def _get_reply_image_url(self, event: AstrMessageEvent) -> Optional[str]:
         """获取引用消息中的图片 URL"""
@@ -436,15 +539,23 @@ class MemeTextPlugin(Star):
     @filter.event_message_type(filter.EventMessageType.ALL)
     async def on_message(self, event: AstrMessageEvent):
         """监听消息，处理表情文字命令"""
-        text = event.message_str.strip() if event.message_str else ""
+        text = event.message_str
+        if not text:
+            return
         
         # 检查命令格式（不需要#前缀）
+        # 绝大多数消息都不是命令，先直接判断前缀，不做 strip 等复制
         prefix = self.command_prefix
         if not text.startswith(prefix):
-            return
+            # 只有开头带空白的消息才去掉空白再判断一次
+            if not text[0].isspace():
+                return
+            text = text.lstrip()
+            if not text.startswith(prefix):
+                return
         
         # 解析参数
-        args_text = text[len(prefix):].strip()
+        args_text = text[self._prefix_len:].strip()
         if not args_text:
             await event.send(event.plain_result(f"❌ 用法: {prefix} 文字 [颜色] [字体大小] [位置] [描边]\n"
                 f"示例: {prefix} 我是帅哥 白色 中字体 下\n"
@@ -475,49 +586,55 @@ class MemeTextPlugin(Star):
             event.stop_event()
             return
         
-        # 下载图片
-        await event.send(event.plain_result("⏳ 处理中..."))
-        img_data = await self._download_image(img_url)
-        if not img_data:
-            await event.send(event.plain_result("❌ 图片下载失败"))
+        # 同一张图片、同样参数直接复用之前的结果，跳过下载和处理
+        cache_key = (img_url, args["text"], args["color"], args["size"], args["position"], args["stroke"])
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            self._result_cache.move_to_end(cache_key)
+            await event.send(event.chain_result([ImageComponent.fromBytes(cached)]))
             event.stop_event()
             return
         
-        try:
-            # 处理图片
-            result_data, img_format = self._process_image(
-                img_data, 
-                args["text"],
-                args["color"],
-                args["size"],
-                args["position"],
-                args["stroke"]
-            )
-            
-            # 保存临时文件
-            temp_dir = os.path.join(PLUGIN_DIR, "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            import time
-            temp_file = os.path.join(temp_dir, f"meme_{int(time.time() * 1000)}.{img_format}")
-            with open(temp_file, "wb") as f:
-                f.write(result_data)
-            
-            # 发送图片
-            await event.send(event.image_result(temp_file))
-            
-            # 清理临时文件
+        # 下载图片
+        await event.send(event.plain_result("⏳ 处理中..."))
+        # 限制并发，突发消息时避免同时解码大量图片
+        async with self._sem:
+            img_data = await self._download_image(img_url)
+            if not img_data:
+                await event.send(event.plain_result("❌ 图片下载失败"))
+                event.stop_event()
+                return
+        
             try:
-                os.remove(temp_file)
-            except:
-                pass
+                # 处理图片
+                result_data, _ = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    self._process_image,
+                    img_data, 
+                    args["text"],
+                    args["color"],
+                    args["size"],
+                    args["position"],
+                    args["stroke"]
+                )
+                self._cache_result(cache_key, result_data)
             
-        except Exception as e:
-            logger.error(f"[表情文字] 处理图片失败: {e}")
-            await event.send(event.plain_result(f"❌ 处理失败: {e}"))
+                # 直接发送内存中的图片数据，不落盘
+                await event.send(event.chain_result([ImageComponent.fromBytes(result_data)]))
+            
+            except Exception as e:
+                logger.error(f"[表情文字] 处理图片失败: {e}")
+                await event.send(event.plain_result(f"❌ 处理失败: {e}"))
         
         event.stop_event()
 
+    async def terminate(self):
+        """插件卸载时关闭 HTTP 会话和处理线程池"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+        self._executor.shutdown(wait=False)
+
     @filter.command("皓月表情加字帮助")
     async def cmd_help(self, event: AstrMessageEvent):
         """显示帮助信息"""